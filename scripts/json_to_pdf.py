@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
-import argparse, json, re
+import argparse, json, os, re, sys
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import chain, islice
 from pathlib import Path
 from datetime import datetime
 
@@ -13,6 +16,18 @@ from reportlab.platypus import (
 )
 from reportlab.pdfbase.pdfmetrics import stringWidth
 
+# orjson is optional; it parses bytes directly and is much faster on large inputs
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# ijson is optional; only needed for --stream
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 # ---------- Styles ----------
 styles = getSampleStyleSheet()
 styles.add(ParagraphStyle(
@@ -40,6 +55,13 @@ styles.add(ParagraphStyle(
 styles.add(ParagraphStyle(
     name="Mono", parent=styles["Normal"], fontSize=9, leading=12
 ))
+# Bound once so per-term rendering skips the stylesheet lookup
+_TITLE_TERM = styles["TitleTerm"]
+_H2 = styles["H2"]
+_META = styles["Meta"]
+_BODY = styles["Body"]
+_KEY = styles["Key"]
+
 bullet_style = ListStyle("Bullets")
 bullet_style.leftIndent = 18
 bullet_style.bulletIndent = 9
@@ -52,6 +74,23 @@ num_style.bulletIndent = 9
 PAGE_W, PAGE_H = LETTER
 MARGIN = 0.5 * inch
 
+# Load Helvetica metrics up front so forked split-item workers inherit them
+stringWidth("x", "Helvetica", 8)
+stringWidth("x", "Helvetica", 9)
+
+_SLUG_RE = re.compile(r"[^A-Za-z0-9._-]+")
+# Digit runs long enough to overflow a 64-bit integer (a cheap, conservative check)
+_LONG_INT_RE = re.compile(rb"\d{19,}")
+
+# Split items handed to each worker per batch (and held in flight per worker when streaming)
+_SPLIT_CHUNKSIZE = 8
+
+# Item fields rendered by dedicated sections in build_term_story
+_HANDLED_KEYS = frozenset({
+    "id", "canonical_term", "name", "title", "definition", "synonyms", "relationships",
+    "prompt_examples", "agent_execution", "metadata", "version", "date_added", "registry",
+})
+
 # ---------- Helpers ----------
 
 def build_cover_story():
@@ -66,17 +105,17 @@ def build_cover_story():
     story.append(PageBreak())
     return story
 
-def _p(text, style="Body"):
+def _p(text, style=_BODY):
     if text is None:
         text = ""
     # Basic sanitization for PDF paragraphs
     text = str(text).replace("\n", "<br/>")
-    return Paragraph(text, styles[style])
+    return Paragraph(text, style)
 
 def _kv_table(kv_pairs):
     if not kv_pairs:
         return None
-    data = [[Paragraph(f"<b>{k}</b>", styles["Key"]), _p(v, "Body")] for k, v in kv_pairs]
+    data = [[Paragraph(f"<b>{k}</b>", _KEY), _p(v)] for k, v in kv_pairs]
     tbl = Table(data, colWidths=[1.6*inch, None])
     tbl.setStyle(TableStyle([
         ("VALIGN", (0,0), (-1,-1), "TOP"),
@@ -101,153 +140,253 @@ def _list_flow(items, numbered=False):
     flow._listStyle = style
     return flow
 
+def _coerce_list(v):
+    # Parsed JSON only produces exact lists/dicts, so an identity check is enough
+    return v if type(v) is list else []
+
+def _coerce_dict(v):
+    return v if type(v) is dict else {}
+
+def _mk_doc(path):
+    return SimpleDocTemplate(path, pagesize=LETTER, leftMargin=MARGIN, rightMargin=MARGIN,
+                             topMargin=MARGIN, bottomMargin=MARGIN)
+
+def _loads(raw):
+    # orjson turns integers outside 64 bits into floats and rejects NaN/Infinity,
+    # so such inputs go to the stdlib and the output never depends on orjson
+    if orjson is not None and not _LONG_INT_RE.search(raw):
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
 def _slugify(s):
-    return re.sub(r"[^A-Za-z0-9._-]+", "_", str(s))[:150]
+    return _SLUG_RE.sub("_", str(s))[:150]
 
-def _page_footer(canvas, doc):
-    canvas.saveState()
-    footer = f"Generated {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%SZ')}"
-    w = stringWidth(footer, "Helvetica", 8)
-    canvas.setFont("Helvetica", 8)
-    canvas.setFillColor(colors.grey)
-    canvas.drawString(MARGIN, 0.5*inch, footer)
-    page_num = f"Page {doc.page}"
-    canvas.drawString(PAGE_W - MARGIN - stringWidth(page_num, "Helvetica", 8), 0.5*inch, page_num)
-    canvas.restoreState()
+def _iter_json_items(path):
+    # Pull items out of a top-level JSON array one at a time
+    with open(path, "rb") as f:
+        try:
+            yield from ijson.items(f, "item", use_float=True)
+        except ijson.JSONError as e:
+            # yajl backends append a multi-line excerpt; keep only the reason
+            reason = str(e).strip().splitlines()[0]
+            raise ValueError(
+                f"{path}: cannot stream this input ({reason}). --stream only accepts strict "
+                "JSON (no NaN/Infinity) with integers that fit in 64 bits; "
+                "rerun without --stream"
+            ) from e
+
+def _stream_json(path):
+    # Only a top-level array can be streamed; anything else is parsed in full
+    # so it renders exactly as it would without --stream
+    try:
+        with open(path, "rb") as f:
+            _, event, _ = next(ijson.parse(f))
+    except (StopIteration, ijson.JSONError):
+        event = None
+    if event != "start_array":
+        return _loads(Path(path).read_bytes())
+    return _iter_json_items(path)
+
+def _make_page_footer(footer):
+    # Helvetica digits share one advance width, so "Page N" width only depends on its length
+    page_num_widths = {}
+
+    def footer_fn(canvas, doc):
+        canvas.saveState()
+        canvas.setFont("Helvetica", 8)
+        canvas.setFillColor(colors.grey)
+        canvas.drawString(MARGIN, 0.5*inch, footer)
+        page_num = f"Page {doc.page}"
+        w = page_num_widths.get(len(page_num))
+        if w is None:
+            w = page_num_widths[len(page_num)] = stringWidth(page_num, "Helvetica", 8)
+        canvas.drawString(PAGE_W - MARGIN - w, 0.5*inch, page_num)
+        canvas.restoreState()
+
+    return footer_fn
 
 # ---------- Render a single term ----------
 def build_term_story(item):
-    story = []
+    # Yields flowables so callers can extend a document story without per-term lists
     # Title line: canonical_term or id
     title = item.get("canonical_term") or item.get("name") or item.get("title") or item.get("id") or "Term"
-    story.append(_p(title, "TitleTerm"))
+    yield _p(title, _TITLE_TERM)
 
     # Meta row
     meta_bits = []
-    for key in ["id", "version", "registry", "date_added"]:
+    for key in ("id", "version", "registry", "date_added"):
         if item.get(key):
             meta_bits.append(f"<b>{key}</b>: {item[key]}")
     if meta_bits:
-        story.append(_p(" | ".join(meta_bits), "Meta"))
-        story.append(Spacer(1, 6))
+        yield _p(" | ".join(meta_bits), _META)
+        yield Spacer(1, 6)
 
     # Definition
     if item.get("definition"):
-        story.append(_p("Definition", "H2"))
-        story.append(_p(item["definition"]))
-        story.append(Spacer(1, 6))
+        yield _p("Definition", _H2)
+        yield _p(item["definition"])
+        yield Spacer(1, 6)
 
     # Synonyms
-    syns = item.get("synonyms") or []
-    if isinstance(syns, list) and syns:
-        story.append(_p("Synonyms", "H2"))
+    syns = _coerce_list(item.get("synonyms"))
+    if syns:
+        yield _p("Synonyms", _H2)
         flow = _list_flow(syns, numbered=False)
-        if flow: story.append(flow)
-        story.append(Spacer(1, 6))
+        if flow: yield flow
+        yield Spacer(1, 6)
 
     # Relationships
-    rels = item.get("relationships") or []
-    if isinstance(rels, list) and rels:
-        story.append(_p("Relationships", "H2"))
+    rels = _coerce_list(item.get("relationships"))
+    if rels:
+        yield _p("Relationships", _H2)
         flow = _list_flow(rels, numbered=False)
-        if flow: story.append(flow)
-        story.append(Spacer(1, 6))
+        if flow: yield flow
+        yield Spacer(1, 6)
 
     # Prompt examples
-    ex = item.get("prompt_examples") or []
-    if isinstance(ex, list) and ex:
-        story.append(_p("Prompt examples", "H2"))
+    ex = _coerce_list(item.get("prompt_examples"))
+    if ex:
+        yield _p("Prompt examples", _H2)
         flow = _list_flow(ex, numbered=False)
-        if flow: story.append(flow)
-        story.append(Spacer(1, 6))
+        if flow: yield flow
+        yield Spacer(1, 6)
 
     # Agent execution
-    agent = item.get("agent_execution") or {}
-    if isinstance(agent, dict) and agent:
-        story.append(_p("Agent execution", "H2"))
+    agent = _coerce_dict(item.get("agent_execution"))
+    if agent:
+        yield _p("Agent execution", _H2)
         interp = agent.get("interpretation")
         if interp:
-            story.append(_p("<b>Interpretation</b>", "Body"))
-            story.append(_p(interp))
-            story.append(Spacer(1, 4))
-        actions = agent.get("actions")
-        if isinstance(actions, list) and actions:
-            story.append(_p("<b>Actions</b>", "Body"))
+            yield _p("<b>Interpretation</b>", _BODY)
+            yield _p(interp)
+            yield Spacer(1, 4)
+        actions = _coerce_list(agent.get("actions"))
+        if actions:
+            yield _p("<b>Actions</b>", _BODY)
             flow = _list_flow(actions, numbered=False)
-            if flow: story.append(flow)
-            story.append(Spacer(1, 6))
+            if flow: yield flow
+            yield Spacer(1, 6)
 
     # Metadata section
-    meta = item.get("metadata") or {}
-    if isinstance(meta, dict) and meta:
-        story.append(_p("Metadata", "H2"))
+    meta = _coerce_dict(item.get("metadata"))
+    if meta:
+        yield _p("Metadata", _H2)
         kvs = []
-        for k in ["author", "source_url"]:
+        for k in ("author", "source_url"):
             if meta.get(k):
                 kvs.append((k, meta[k]))
         others = [(k, v) for k, v in meta.items() if k not in {"author", "source_url"}]
         kvs.extend(others)
         tbl = _kv_table(kvs)
-        if tbl: story.append(tbl)
-        story.append(Spacer(1, 6))
+        if tbl: yield tbl
+        yield Spacer(1, 6)
 
     # Any remaining fields not handled above
-    used = {"id","canonical_term","name","title","definition","synonyms","relationships",
-            "prompt_examples","agent_execution","metadata","version","date_added","registry"}
-    leftover = [(k, item[k]) for k in item.keys() if k not in used]
+    leftover = [(k, item[k]) for k in item.keys() if k not in _HANDLED_KEYS]
     if leftover:
-        story.append(_p("Other fields", "H2"))
+        yield _p("Other fields", _H2)
         # Coerce values to strings
         kvs = [(k, json.dumps(v, ensure_ascii=False) if not isinstance(v, str) else v) for k,v in leftover]
         tbl = _kv_table(kvs)
-        if tbl: story.append(tbl)
-
-    return story
+        if tbl: yield tbl
 
 # ---------- Main convert paths ----------
+def _split_jobs(items, out_parent, stem, footer):
+    # Filenames are resolved here, in the parent, so colliding slugs get distinct
+    # paths instead of two workers writing the same file
+    seen = set()
+    for idx, item in enumerate(items):
+        safe = None
+        if isinstance(item, dict):
+            for key in ("id", "canonical_term", "name", "title"):
+                if item.get(key):
+                    safe = _slugify(item[key])
+                    break
+        if not safe:
+            safe = f"item_{idx:04d}"
+        fname = f"{stem}-{safe}.pdf"
+        # "+" never survives _slugify, so a renamed duplicate can't take another
+        # item's natural name; the loop is only a backstop
+        n = idx
+        while fname in seen:
+            fname = f"{stem}-{safe}+{n:04d}.pdf"
+            n += 1
+        seen.add(fname)
+        yield item, str(out_parent / fname), footer
+
+def _build_one(job):
+    # Module-level so it can be pickled for the process pool
+    item, sp, footer = job
+    doc = _mk_doc(sp)
+    story = list(build_term_story(item if isinstance(item, dict) else {"value": item}))
+    footer_fn = _make_page_footer(footer)
+    doc.build(story, onLaterPages=footer_fn, onFirstPage=footer_fn)
+    return sp
+
+def _map_bounded(executor, fn, jobs, limit):
+    # executor.map drains its whole input up front, which would defeat --stream;
+    # keep at most `limit` jobs in flight and restore input order at the end
+    results = {}
+    pending = {}
+    for idx, job in enumerate(jobs):
+        if len(pending) >= limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                results[pending.pop(fut)] = fut.result()
+        pending[executor.submit(fn, job)] = idx
+    for fut in wait(pending).done:
+        results[pending[fut]] = fut.result()
+    return [results[i] for i in range(len(results))]
+
 def render_to_pdf(data, out_path, split_items=False):
     out_path = Path(out_path)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-
-    if split_items and isinstance(data, list):
-        made = []
-        for idx, item in enumerate(data):
-            safe = None
-            if isinstance(item, dict):
-                for key in ["id", "canonical_term", "name", "title"]:
-                    if item.get(key):
-                        safe = _slugify(item[key])
-                        break
-            if not safe:
-                safe = f"item_{idx:04d}"
-            fname = f"{out_path.stem}-{safe}.pdf"
-            doc = SimpleDocTemplate(str(out_path.parent / fname),
-                                    pagesize=LETTER, leftMargin=MARGIN, rightMargin=MARGIN,
-                                    topMargin=MARGIN, bottomMargin=MARGIN)
-            story = build_term_story(item if isinstance(item, dict) else {"value": item})
-            doc.build(story, onLaterPages=_page_footer, onFirstPage=_page_footer)
-            made.append(str(out_path.parent / fname))
-        return made
+    out_parent = out_path.parent
+    out_parent.mkdir(parents=True, exist_ok=True)
+    footer = f"Generated {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%SZ')}"
+
+    if split_items and isinstance(data, (list, Iterator)):
+        # Items are independent and rendering is CPU-bound, so fan out across cores
+        jobs = _split_jobs(data, out_parent, out_path.stem, footer)
+        cpus = os.cpu_count() or 1
+        if isinstance(data, list):
+            workers = min(cpus, len(data))
+            if workers <= 1:
+                # A pool would only add process startup and pickling
+                return [_build_one(job) for job in jobs]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(_build_one, jobs, chunksize=_SPLIT_CHUNKSIZE))
+        # Streamed input: the length is unknown, so size the pool from a peek
+        head = list(islice(jobs, cpus))
+        if not head:
+            return []
+        workers = len(head)
+        if workers == 1:
+            return [_build_one(job) for job in chain(head, jobs)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return _map_bounded(executor, _build_one, chain(head, jobs),
+                                workers * _SPLIT_CHUNKSIZE)
     else:
         # Single PDF containing all content with page breaks between items when list
-        doc = SimpleDocTemplate(str(out_path),
-                                pagesize=LETTER, leftMargin=MARGIN, rightMargin=MARGIN,
-                                topMargin=MARGIN, bottomMargin=MARGIN)
+        doc = _mk_doc(str(out_path))
         story = []
          # Add cover page first
         story.extend(build_cover_story())
 
         # Then add terms
-        if isinstance(data, list):
+        if isinstance(data, (list, Iterator)):
             for i, item in enumerate(data):
-                story.extend(build_term_story(item if isinstance(item, dict) else {"value": item}))
-                if i < len(data) - 1:
+                if i:
                     story.append(PageBreak())
+                story.extend(build_term_story(item if isinstance(item, dict) else {"value": item}))
         elif isinstance(data, dict):
             story.extend(build_term_story(data))
         else:
-            story.append(_p("Unsupported top-level JSON type", "Body"))
-        doc.build(story, onLaterPages=_page_footer, onFirstPage=_page_footer)
+            story.append(_p("Unsupported top-level JSON type", _BODY))
+        footer_fn = _make_page_footer(footer)
+        doc.build(story, onLaterPages=footer_fn, onFirstPage=footer_fn)
         return [str(out_path)]
 
 def main():
@@ -256,14 +395,22 @@ def main():
     ap.add_argument("--outdir", default="generated-pdfs", help="Output directory")
     ap.add_argument("--split-items", action="store_true", help="One PDF per item if input is a list")
     ap.add_argument("--outfile", default=None, help="Optional explicit output filename")
+    ap.add_argument("--stream", action="store_true",
+                    help="Parse a top-level JSON list incrementally (requires ijson; "
+                         "strict JSON only: no NaN/Infinity, integers must fit in 64 bits)")
     args = ap.parse_args()
 
-    data = json.load(open(args.input, "r", encoding="utf-8"))
+    if args.stream:
+        if ijson is None:
+            ap.error("--stream requires the ijson package")
+        data = _stream_json(args.input)
+    else:
+        data = _loads(Path(args.input).read_bytes())
     out_dir = Path(args.outdir); out_dir.mkdir(parents=True, exist_ok=True)
     out_file = Path(args.outfile) if args.outfile else out_dir / (Path(args.input).stem + ".pdf")
     made = render_to_pdf(data, out_file, split_items=args.split_items)
-    for p in made:
-        print("Created:", p)
+    # One write for the whole report; --split-items can produce many lines
+    sys.stdout.write("".join(f"Created: {p}\n" for p in made))
 
 if __name__ == "__main__":
     main()